@@ -1,7 +1,9 @@
 #!/usr/bin/env python3.8
 
 from __future__ import absolute_import
+import base64
 import datetime
+import hashlib
 import logging
 import io
 import json
@@ -15,6 +17,7 @@ import uuid
 from io import BytesIO
 
 import psutil
+import requests
 import warcio
 
 from sfmutils.harvester import BaseHarvester, Msg
@@ -33,6 +36,13 @@ MAX_WARC_RECORD_SIZE = 50 * 2**20
 MAX_WARC_RECORD_SIZE_MEDIA = 16 * 2**10
 # if WARC records are truncated, payload is truncated to 1 kiB
 WARC_RECORD_TRUNCATION_SIZE = 2**10
+# timeout of the conditional request to check whether the seed has changed
+SEED_CHECK_TIMEOUT = 30
+# max. size of the seed page (10 MiB) read to check whether the seed has changed
+SEED_CHECK_MAX_SIZE = 10 * 2**20
+# user agent of the browser (Chrome 91) used by browsertrix-crawler 0.5
+# if not overridden by the option --userAgent
+CRAWLER_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
 class BrowsertrixHarvester(BaseHarvester):
 
@@ -58,6 +68,18 @@ class BrowsertrixHarvester(BaseHarvester):
         browsertrix_args = self.message.get("options", {}).get("browsertrix_args", "")
         browsertrix_args = re.split(r'\s+', browsertrix_args)
         collection_id = uuid.uuid4().hex
+
+        seed_validators = None
+        if self.message.get("options", {}).get("skip_unchanged", False):
+            (unchanged, seed_validators) = self.check_seed_unchanged(seed_url, browsertrix_args)
+            if unchanged:
+                self.update_seed_validators(seed_url, seed_validators)
+                msg = "Seed not changed since previous harvest, skipped crawl: {}".format(seed_url)
+                log.info(msg)
+                self.result.infos.append(Msg("crawl_skipped_unchanged", msg, seed_id=seed_url))
+                self.result.harvest_counter["seeds_unchanged"] += 1
+                return
+
         browsertrix_args = ['crawl', '--collection', collection_id, *browsertrix_args, '--url', seed_url]
 
         self.init_collection(collection_id)
@@ -81,6 +103,7 @@ class BrowsertrixHarvester(BaseHarvester):
                 log.info("Crawl succeeded")
                 self.crawl_result_to_warc(collection_id, seed_url, browsertrix_args, res)
                 self.update_page_list(collection_id)
+                self.update_seed_validators(seed_url, seed_validators)
                 self.cleanup_warcs(collection_id)
             else:
                 msg = "Crawl failed with exit value {}, stderr:\n{}".format(
@@ -99,7 +122,7 @@ class BrowsertrixHarvester(BaseHarvester):
                 log.debug("Stderr:\n%s\n", e.stderr)
                 time.sleep(1)
                 log.debug("<" * 40)
-            self.crawl_result_to_warc(collection_id, seed_url, browsertrix_args, res)
+            self.crawl_result_to_warc(collection_id, seed_url, browsertrix_args, e)
             self.update_page_list(collection_id)
             self.cleanup_warcs(collection_id)
 
@@ -122,6 +145,87 @@ class BrowsertrixHarvester(BaseHarvester):
                     child.kill()
                     child.wait(1)
 
+    @staticmethod
+    def get_browsertrix_arg(browsertrix_args, name):
+        """value of the option `name` in browsertrix_args, or None if not given.
+        Because browsertrix_args are split at white space, the value is joined
+        from all arguments until the next option."""
+        if name not in browsertrix_args:
+            return None
+        value = []
+        for arg in browsertrix_args[browsertrix_args.index(name)+1:]:
+            if arg.startswith('--'):
+                break
+            value.append(arg)
+        return ' '.join(value)
+
+    @staticmethod
+    def seed_check_user_agent(browsertrix_args):
+        user_agent = BrowsertrixHarvester.get_browsertrix_arg(browsertrix_args, '--userAgent')
+        if user_agent:
+            return user_agent
+        user_agent_suffix = BrowsertrixHarvester.get_browsertrix_arg(browsertrix_args, '--userAgentSuffix')
+        if user_agent_suffix:
+            return CRAWLER_USER_AGENT + ' ' + user_agent_suffix
+        return CRAWLER_USER_AGENT
+
+    def check_seed_unchanged(self, seed_url, browsertrix_args):
+        """send a conditional request for the seed URL using the validators
+        (ETag, Last-Modified, payload digest) stored by the previous harvest.
+        Returns a tuple (unchanged, validators) where validators are those
+        of the current seed response, to be stored after a successful crawl."""
+        all_validators = self.state_store.get_state(__name__, 'seed.validators')
+        validators = (all_validators or dict()).get(seed_url)
+        headers = {'User-Agent': BrowsertrixHarvester.seed_check_user_agent(browsertrix_args)}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        deadline = time.monotonic() + SEED_CHECK_TIMEOUT
+        try:
+            with requests.get(seed_url, headers=headers, timeout=SEED_CHECK_TIMEOUT, stream=True) as res:
+                if res.status_code == 304 and validators:
+                    log.debug("Seed %s not modified (HTTP 304)", seed_url)
+                    return (True, validators)
+                if res.status_code != 200:
+                    log.debug("Seed %s check returned HTTP status %d", seed_url, res.status_code)
+                    return (False, None)
+                digest = hashlib.sha1()
+                size = 0
+                for chunk in res.iter_content(2**16):
+                    size += len(chunk)
+                    if size > SEED_CHECK_MAX_SIZE:
+                        log.warning("Seed %s exceeds %d bytes, not checked for changes",
+                                    seed_url, SEED_CHECK_MAX_SIZE)
+                        return (False, None)
+                    if time.monotonic() > deadline:
+                        log.warning("Seed %s check timed out", seed_url)
+                        return (False, None)
+                    digest.update(chunk)
+        except requests.exceptions.RequestException as e:
+            log.warning("Failed to check seed %s for changes: %s", seed_url, e)
+            return (False, None)
+
+        new_validators = {
+            'etag': res.headers.get('ETag'),
+            'last_modified': res.headers.get('Last-Modified'),
+            'digest': 'sha1:' + base64.b32encode(digest.digest()).decode('ascii'),
+        }
+        if validators and validators.get('digest') == new_validators['digest']:
+            log.debug("Seed %s not modified (payload digest %s)", seed_url, new_validators['digest'])
+            return (True, new_validators)
+        return (False, new_validators)
+
+    def update_seed_validators(self, seed_url, validators):
+        if not validators:
+            return
+        all_validators = self.state_store.get_state(__name__, 'seed.validators')
+        if not all_validators:
+            all_validators = dict()
+        all_validators[seed_url] = validators
+        self.state_store.set_state(__name__, 'seed.validators', all_validators)
+
     def log_stats(self, collection_id):
         stats_file = os.path.join('/crawls/collections', collection_id, 'stats.json')
         if os.path.exists(stats_file):
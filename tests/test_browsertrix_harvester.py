@@ -0,0 +1,39 @@
+from __future__ import absolute_import
+
+import subprocess
+import unittest
+
+from mock import patch
+from sfmutils.result import HarvestResult
+from sfmutils.state_store import DictHarvestStateStore
+
+from browsertrix_harvester import BrowsertrixHarvester
+
+
+class TestBrowsertrixHarvester(unittest.TestCase):
+
+    def setUp(self):
+        self.harvester = BrowsertrixHarvester.__new__(BrowsertrixHarvester)
+        self.harvester.debug = False
+        self.harvester.state_store = DictHarvestStateStore()
+        self.harvester.result = HarvestResult()
+        self.harvester.message = {
+            "id": "test_1",
+            "seeds": [{"token": "http://example.com/"}],
+            "options": {},
+        }
+
+    @patch.object(BrowsertrixHarvester, 'cleanup_warcs')
+    @patch.object(BrowsertrixHarvester, 'update_page_list')
+    @patch.object(BrowsertrixHarvester, 'crawl_result_to_warc')
+    @patch.object(BrowsertrixHarvester, 'init_collection')
+    @patch('browsertrix_harvester.subprocess.run')
+    def test_crawl_timeout(self, mock_run, mock_init_collection, mock_crawl_result_to_warc,
+                           mock_update_page_list, mock_cleanup_warcs):
+        mock_run.side_effect = subprocess.TimeoutExpired(['crawl'], 60*60*3)
+        self.harvester.harvest_seeds()
+        # WARC files of the timed-out crawl are kept
+        mock_crawl_result_to_warc.assert_called_once()
+        mock_update_page_list.assert_called_once()
+        mock_cleanup_warcs.assert_called_once()
+        self.assertFalse(self.harvester.result.errors)
@@ -0,0 +1,165 @@
+from __future__ import absolute_import
+
+import http.server
+import socket
+import threading
+import unittest
+
+from mock import MagicMock, patch
+from sfmutils.result import HarvestResult
+from sfmutils.state_store import DictHarvestStateStore
+
+from browsertrix_harvester import BrowsertrixHarvester, CRAWLER_USER_AGENT
+
+
+class SeedHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP stand-in for a seed: serves the body and ETag of the server,
+    responds with 304 if the ETag matches If-None-Match"""
+
+    def do_GET(self):
+        self.server.user_agent = self.headers.get('User-Agent')
+        etag = self.server.etag
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSeedCheck(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), SeedHandler)
+        self.server.etag = None
+        self.server.body = b'<html><body><a href="/a">A</a></body></html>'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.seed_url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+
+        self.harvester = BrowsertrixHarvester.__new__(BrowsertrixHarvester)
+        self.harvester.debug = False
+        self.harvester.state_store = DictHarvestStateStore()
+        self.harvester.result = HarvestResult()
+        self.harvester.message = {
+            "id": "test_1",
+            "seeds": [{"token": self.seed_url}],
+            "options": {"skip_unchanged": True},
+        }
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def check_and_store(self, browsertrix_args=[]):
+        (unchanged, validators) = self.harvester.check_seed_unchanged(self.seed_url, browsertrix_args)
+        self.harvester.update_seed_validators(self.seed_url, validators)
+        return (unchanged, validators)
+
+    def stored_validators(self):
+        all_validators = self.harvester.state_store.get_state('browsertrix_harvester', 'seed.validators')
+        return (all_validators or dict()).get(self.seed_url)
+
+    def test_first_harvest(self):
+        (unchanged, validators) = self.check_and_store()
+        self.assertFalse(unchanged)
+        self.assertTrue(validators['digest'].startswith('sha1:'))
+        self.assertEqual(CRAWLER_USER_AGENT, self.server.user_agent)
+
+    def test_not_modified(self):
+        self.server.etag = '"a"'
+        self.check_and_store()
+        (unchanged, validators) = self.check_and_store()
+        self.assertTrue(unchanged)
+        self.assertEqual('"a"', validators['etag'])
+
+    def test_same_digest(self):
+        self.server.etag = '"a"'
+        self.check_and_store()
+        self.server.etag = '"b"'
+        (unchanged, _) = self.check_and_store()
+        self.assertTrue(unchanged)
+        self.assertEqual('"b"', self.stored_validators()['etag'])
+
+    def test_changed_body(self):
+        self.check_and_store()
+        self.server.body = b'<html><body><a href="/a">A (updated)</a></body></html>'
+        (unchanged, _) = self.check_and_store()
+        self.assertFalse(unchanged)
+
+    def test_connection_error(self):
+        self.check_and_store()
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.seed_url = 'http://127.0.0.1:{}/'.format(sock.getsockname()[1])
+        (unchanged, validators) = self.harvester.check_seed_unchanged(self.seed_url, [])
+        self.assertFalse(unchanged)
+        self.assertIsNone(validators)
+
+    def test_user_agent(self):
+        self.check_and_store(['--userAgent', 'Mozilla/5.0', '(compatible;', 'Test)', '--workers', '2'])
+        self.assertEqual('Mozilla/5.0 (compatible; Test)', self.server.user_agent)
+        self.check_and_store(['--userAgentSuffix', 'Test'])
+        self.assertEqual(CRAWLER_USER_AGENT + ' Test', self.server.user_agent)
+
+    @patch('browsertrix_harvester.SEED_CHECK_MAX_SIZE', 16)
+    def test_max_size(self):
+        self.check_and_store()
+        (unchanged, validators) = self.harvester.check_seed_unchanged(self.seed_url, [])
+        self.assertFalse(unchanged)
+        self.assertIsNone(validators)
+
+    @patch.object(BrowsertrixHarvester, 'cleanup_warcs')
+    @patch.object(BrowsertrixHarvester, 'update_page_list')
+    @patch.object(BrowsertrixHarvester, 'crawl_result_to_warc')
+    @patch.object(BrowsertrixHarvester, 'log_stats')
+    @patch.object(BrowsertrixHarvester, 'init_collection')
+    @patch('browsertrix_harvester.subprocess.run')
+    def test_harvest_unchanged_seed(self, mock_run, *mock_methods):
+        mock_run.return_value = MagicMock(returncode=0, stdout='', stderr='')
+        self.harvester.harvest_seeds()
+        mock_run.assert_called_once()
+        self.assertIsNotNone(self.stored_validators())
+
+        self.harvester.result = HarvestResult()
+        self.harvester.harvest_seeds()
+        mock_run.assert_called_once()
+        self.assertEqual(['crawl_skipped_unchanged'], [msg.code for msg in self.harvester.result.infos])
+        self.assertEqual(1, self.harvester.result.harvest_counter['seeds_unchanged'])
+        self.assertFalse(self.harvester.result.errors)
+
+    @patch.object(BrowsertrixHarvester, 'cleanup_warcs')
+    @patch.object(BrowsertrixHarvester, 'update_page_list')
+    @patch.object(BrowsertrixHarvester, 'crawl_result_to_warc')
+    @patch.object(BrowsertrixHarvester, 'log_stats')
+    @patch.object(BrowsertrixHarvester, 'init_collection')
+    @patch('browsertrix_harvester.subprocess.run')
+    def test_harvest_changed_seed(self, mock_run, *mock_methods):
+        # failed crawl: validators are not stored
+        mock_run.return_value = MagicMock(returncode=1, stdout='', stderr='failed')
+        self.harvester.harvest_seeds()
+        mock_run.assert_called_once()
+        self.assertIsNone(self.stored_validators())
+
+        # successful crawl: validators are stored
+        mock_run.return_value = MagicMock(returncode=0, stdout='', stderr='')
+        self.harvester.result = HarvestResult()
+        self.harvester.harvest_seeds()
+        self.assertEqual(2, mock_run.call_count)
+        digest = self.stored_validators()['digest']
+        self.assertFalse(self.harvester.result.errors)
+
+        # changed seed: crawled again
+        self.server.body = b'<html><body><a href="/a">A (updated)</a></body></html>'
+        self.harvester.result = HarvestResult()
+        self.harvester.harvest_seeds()
+        self.assertEqual(3, mock_run.call_count)
+        self.assertFalse(self.harvester.result.infos)
+        self.assertNotEqual(digest, self.stored_validators()['digest'])